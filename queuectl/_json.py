@@ -0,0 +1,37 @@
+"""
+Thin JSON shim.
+Uses orjson when it is installed and falls back to the stdlib otherwise.
+"""
+from typing import Any
+
+try:
+    import orjson
+
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def dumps(obj: Any, indent: int = 2) -> str:
+        """Serializes obj to a str (orjson only supports 2-space indents)."""
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+
+    def dumpb(obj: Any, indent: int = 2) -> bytes:
+        """Serializes obj straight to UTF-8 bytes."""
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option)
+
+    loads = orjson.loads
+
+except ImportError:
+    import json
+
+    JSONDecodeError = json.JSONDecodeError
+
+    def dumps(obj: Any, indent: int = 2) -> str:
+        """Serializes obj to a str."""
+        return json.dumps(obj, indent=indent or None)
+
+    def dumpb(obj: Any, indent: int = 2) -> bytes:
+        """Serializes obj straight to UTF-8 bytes."""
+        return json.dumps(obj, indent=indent or None).encode()
+
+    loads = json.loads
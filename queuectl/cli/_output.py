@@ -0,0 +1,23 @@
+import sys
+from typing import Iterable, List
+
+from .. import _json
+
+def write_rows(rows: List[dict], ndjson: bool = False):
+    """
+    Writes job rows to stdout in one go.
+    By default the rows are a single indented JSON array; with ndjson,
+    each row is a compact JSON object on its own line.
+    """
+    # Flush anything already echoed through the text layer first
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    if ndjson:
+        out.writelines(_ndjson_lines(rows))
+    else:
+        out.write(_json.dumpb(rows, indent=2) + b"\n")
+    out.flush()
+
+def _ndjson_lines(rows: Iterable[dict]) -> Iterable[bytes]:
+    for row in rows:
+        yield _json.dumpb(row, indent=0) + b"\n"
@@ -1,6 +1,6 @@
 import typer
-import json  # <-- THE FIX IS HERE
-from ..config import load_config, save_config, DEFAULT_CONFIG
+from .. import _json
+from ..config import load_config, save_config, DEFAULT_CONFIG, MIN_CONFIG_VALUES
 
 app = typer.Typer(name="config", help="Manage configuration.")
 
@@ -24,6 +24,11 @@ def config_set(
     except ValueError:
         typer.secho(f"Error: Invalid value type for '{key}'. Expected {type(DEFAULT_CONFIG[key])}.", fg=typer.colors.RED)
         raise typer.Exit(1)
+
+    minimum = MIN_CONFIG_VALUES.get(key)
+    if minimum is not None and typed_value < minimum:
+        typer.secho(f"Error: '{key}' must be at least {minimum}.", fg=typer.colors.RED)
+        raise typer.Exit(1)
         
     config = load_config()
     config[key] = typed_value
@@ -34,4 +39,4 @@ def config_set(
 def config_show():
     """Shows the current configuration."""
     config = load_config()
-    typer.echo(json.dumps(config, indent=2))
\ No newline at end of file
+    typer.echo(_json.dumps(config, indent=2))
\ No newline at end of file
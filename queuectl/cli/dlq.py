@@ -1,21 +1,23 @@
 import typer
-import json
 from ..models import JobState
-from ..database import list_jobs_by_state, find_dlq_job, retry_dlq_job
+from ..database import list_jobs_as_dicts, find_dlq_job, retry_dlq_job
+from ._output import write_rows
 
 app = typer.Typer(name="dlq", help="Manage the Dead Letter Queue (DLQ).")
 
 @app.command("list")
-def dlq_list():
+def dlq_list(
+    ndjson: bool = typer.Option(False, "--ndjson", help="Print one compact JSON object per line.")
+):
     """Lists all jobs in the Dead Letter Queue."""
-    jobs = list_jobs_by_state(JobState.DEAD)
+    jobs = list_jobs_as_dicts(JobState.DEAD)
     if not jobs:
         typer.echo("Dead Letter Queue is empty.")
         return
     
-    typer.echo("--- Jobs in Dead Letter Queue ---")
-    for job in jobs:
-        typer.echo(json.dumps(job.to_dict(), indent=2))
+    if not ndjson:
+        typer.echo("--- Jobs in Dead Letter Queue ---")
+    write_rows(jobs, ndjson=ndjson)
 
 @app.command("retry")
 def dlq_retry(
@@ -1,40 +1,154 @@
 import typer
-import json
 import uuid  # <-- ADD THIS LINE
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from .. import _json
+from ..config import get_config_value
 from ..models import Job
-from ..database import add_job
+from ..database import add_job, add_jobs
 
 app = typer.Typer(name="enqueue", help="Add a new job to the queue.")
 
+# Specs larger than this many UTF-8 bytes are rejected before any parsing
+MAX_JOB_SPEC_SIZE = 64 * 1024
+# Jobs per transaction when enqueuing from a file
+FILE_BATCH_SIZE = 10_000
+
+def parse_job_spec(job_spec: Union[str, bytes]) -> Dict[str, Any]:
+    """
+    Parses and validates a JSON job spec (a str, or raw UTF-8 bytes).
+    Raises ValueError with a user-facing message if it is not usable.
+    """
+    # A str can't be shorter in bytes than in characters, so skip encoding oversize specs
+    too_big = len(job_spec) > MAX_JOB_SPEC_SIZE
+    if not too_big and isinstance(job_spec, str):
+        too_big = len(job_spec.encode("utf-8", "surrogatepass")) > MAX_JOB_SPEC_SIZE
+    if too_big:
+        raise ValueError(f"Job spec exceeds {MAX_JOB_SPEC_SIZE} bytes.")
+
+    try:
+        data = _json.loads(job_spec)
+    except (_json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError("Invalid JSON string.")
+
+    if not isinstance(data, dict) or "command" not in data:
+        raise ValueError("'command' field is required in JSON.")
+
+    if not isinstance(data["command"], str):
+        raise ValueError("'command' must be a string.")
+
+    job_id = data.get("id")
+    if job_id is not None and not isinstance(job_id, str):
+        raise ValueError("'id' must be a string.")
+
+    # An explicit max_retries in the spec skips the config lookup
+    max_retries = data.get("max_retries")
+    # bool is an int subclass, and 0 would mean "use the config value" to the worker
+    if max_retries is not None and (type(max_retries) is not int or max_retries < 1):
+        raise ValueError("'max_retries' must be a positive integer.")
+
+    return data
+
+def enqueue_file(path: Path):
+    """Enqueues one job per line of an NDJSON file, in batched transactions."""
+    default_max_retries = get_config_value("max_retries")
+    inserted = skipped = failed = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted, skipped, failed
+        count = add_jobs(batch)
+        if count is None:
+            # The whole batch was rolled back; the error has already been logged
+            failed += len(batch)
+        else:
+            inserted += count
+            skipped += len(batch) - count
+        batch.clear()
+
+    with open(path, 'rb') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = parse_job_spec(line)
+            except ValueError as e:
+                typer.secho(f"Line {line_no}: {e}", fg=typer.colors.YELLOW, err=True)
+                skipped += 1
+                continue
+
+            max_retries = data.get("max_retries")
+            batch.append(Job(
+                id=data.get("id") or str(uuid.uuid4()),
+                command=data["command"],
+                max_retries=max_retries if max_retries is not None else default_max_retries,
+            ))
+            if len(batch) >= FILE_BATCH_SIZE:
+                flush()
+
+    if batch:
+        flush()
+
+    typer.secho(f"Successfully enqueued {inserted} job(s).", fg=typer.colors.GREEN)
+    if skipped:
+        typer.secho(f"Skipped {skipped} line(s) (invalid spec or ID may exist).", fg=typer.colors.YELLOW)
+    if failed:
+        typer.secho(f"Error: {failed} job(s) were not enqueued due to a database error.", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
 @app.callback(invoke_without_command=True)
 def enqueue(
-    job_spec: str = typer.Argument(
-        ..., 
+    job_spec: Optional[str] = typer.Argument(
+        None, 
         help='The job specification as a JSON string. e.g. \'{"id":"job1", "command":"sleep 2"}\''
-    )
+    ),
+    command: Optional[str] = typer.Option(
+        None, "--command", "-c", help="The command to run. Skips JSON parsing entirely."
+    ),
+    job_id: Optional[str] = typer.Option(
+        None, "--id", help="The job ID to use with --command. Generated if omitted."
+    ),
+    file: Optional[Path] = typer.Option(
+        None, "--file", "-f", exists=True, dir_okay=False, readable=True,
+        help="An NDJSON file with one job spec per line."
+    ),
 ):
     """
     Enqueues a new job.
     """
-    try:
-        data = json.loads(job_spec)
-        if "command" not in data:
-            typer.secho("Error: 'command' field is required in JSON.", fg=typer.colors.RED)
+    if sum(arg is not None for arg in (job_spec, command, file)) != 1:
+        typer.secho("Error: Pass exactly one of a JSON spec, --command or --file.", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if job_id is not None and command is None:
+        typer.secho("Error: --id can only be used with --command (put \"id\" in the JSON spec instead).", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if file is not None:
+        enqueue_file(file)
+        return
+
+    max_retries = None
+
+    if job_spec is not None:
+        try:
+            data = parse_job_spec(job_spec)
+        except ValueError as e:
+            typer.secho(f"Error: {e}", fg=typer.colors.RED)
             raise typer.Exit(1)
-        
-        # Use provided ID or generate a new one
-        job_id = data.get("id")
-        
-        job = Job(
-            id=job_id if job_id else str(uuid.uuid4()),
-            command=data["command"],
-        )
-        
-        if add_job(job):
-            typer.secho(f"Successfully enqueued job {job.id}", fg=typer.colors.GREEN)
-        else:
-            typer.secho(f"Failed to enqueue job {job.id} (ID may exist).", fg=typer.colors.RED)
 
-    except json.JSONDecodeError:
-        typer.secho("Error: Invalid JSON string.", fg=typer.colors.RED)
-        raise typer.Exit(1)
\ No newline at end of file
+        command = data["command"]
+        job_id = data.get("id")
+        max_retries = data.get("max_retries")
+    
+    # Use provided ID or generate a new one
+    job = Job(
+        id=job_id if job_id else str(uuid.uuid4()),
+        command=command,
+    )
+    
+    if add_job(job, max_retries=max_retries):
+        typer.secho(f"Successfully enqueued job {job.id}", fg=typer.colors.GREEN)
+    else:
+        typer.secho(f"Failed to enqueue job {job.id} (ID may exist).", fg=typer.colors.RED)
@@ -1,7 +1,7 @@
 import typer
-import json
 from ..models import JobState
-from ..database import list_jobs_by_state
+from ..database import list_jobs_as_dicts
+from ._output import write_rows
 
 app = typer.Typer(name="list", help="List jobs by state.")
 
@@ -12,16 +12,17 @@ def list_jobs(
         "--state", "-s", 
         help="The job state to list.",
         case_sensitive=False
-    )
+    ),
+    ndjson: bool = typer.Option(False, "--ndjson", help="Print one compact JSON object per line.")
 ):
     """
     Lists jobs by their state.
     """
-    jobs = list_jobs_by_state(state)
+    jobs = list_jobs_as_dicts(state)
     if not jobs:
         typer.echo(f"No jobs found in state: {state.value}")
         return
     
-    typer.echo(f"--- Jobs in '{state.value}' state ---")
-    for job in jobs:
-        typer.echo(json.dumps(job.to_dict(), indent=2))
\ No newline at end of file
+    if not ndjson:
+        typer.echo(f"--- Jobs in '{state.value}' state ---")
+    write_rows(jobs, ndjson=ndjson)
\ No newline at end of file
@@ -1,8 +1,9 @@
-import json
 import os
 from pathlib import Path
 from typing import Dict, Any
 
+from . import _json
+
 # --- THIS IS THE KEY CHANGE ---
 # Store data *inside* the project directory, not in the (synced) home dir.
 # This finds the root of your project: ~/Programs/queuectl-py/
@@ -21,26 +22,46 @@ PID_FILE = APP_DIR / "workers.pid"
 DEFAULT_CONFIG = {
     "max_retries": 3,
     "backoff_base": 2,  # delay = base ^ attempts
+    "claim_batch_size": 1,  # jobs a worker claims per transaction
+}
+
+# Smallest accepted value for keys that have one
+MIN_CONFIG_VALUES = {
+    "claim_batch_size": 1,
 }
 
+# Parsed config, re-read only when the file's mtime changes
+_cache: Dict[str, Any] = {"mtime": 0, "data": None}
+
 def load_config() -> Dict[str, Any]:
     """Loads configuration from file, creating it if non-existent."""
-    if not CONFIG_PATH.exists():
+    try:
+        mtime = CONFIG_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
         save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
+        return dict(DEFAULT_CONFIG)
+
+    if _cache["data"] is not None and _cache["mtime"] == mtime:
+        return _cache["data"]
     
-    with open(CONFIG_PATH, 'r') as f:
+    with open(CONFIG_PATH, 'rb') as f:
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
+            data = _json.loads(f.read())
+        except _json.JSONDecodeError:
             # If config is corrupted, reset to default
             save_config(DEFAULT_CONFIG)
-            return DEFAULT_CONFIG
+            return dict(DEFAULT_CONFIG)
+
+    _cache["mtime"] = mtime
+    _cache["data"] = data
+    return data
 
 def save_config(config: Dict[str, Any]):
     """Saves the configuration dictionary to the config file."""
     with open(CONFIG_PATH, 'w') as f:
-        json.dump(config, f, indent=2)
+        f.write(_json.dumps(config, indent=2))
+    # Force the next load_config() to re-read the file
+    _cache["data"] = None
 
 def get_config_value(key: str) -> Any:
     """Utility to get a single config value."""
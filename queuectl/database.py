@@ -1,15 +1,108 @@
+import random
 import sqlite3
 import threading
+import time
 from contextlib import contextmanager
-from datetime import datetime
 from typing import Optional, List, Tuple, Dict, Any
 
 from .config import DB_PATH, get_config_value
-from .models import Job, JobState
+from .log import log
+from .models import (
+    Job, JobState, utcnow_iso,
+    PENDING, PROCESSING, COMPLETED, FAILED, DEAD,
+)
 
 # Use thread-local storage for DB connections
 local_storage = threading.local()
 
+# Applied to every new connection.
+# WAL lets status/list readers run while a worker holds the write lock,
+# and busy_timeout handles lock contention between workers.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA cache_size=-20000;",
+    "PRAGMA busy_timeout=5000;",
+)
+
+# Attempts at BEGIN IMMEDIATE before a claim gives up. Each attempt already
+# waits up to busy_timeout inside SQLite, so this only matters under heavy contention.
+BEGIN_RETRIES = 3
+
+# SQL used on the hot paths is kept at module scope so every call passes
+# the exact same string and hits sqlite3's per-connection statement cache.
+_JOB_COLUMNS = "id, command, state, attempts, max_retries, created_at, updated_at"
+
+# Duplicate IDs are skipped rather than raised; callers check rowcount.
+_SQL_INSERT_JOB = f"""
+INSERT INTO jobs ({_JOB_COLUMNS})
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO NOTHING
+"""
+# Rows are copied between jobs and dlq inside the engine;
+# only the columns that change are bound from Python.
+_SQL_MOVE_TO_DLQ = f"""
+INSERT INTO dlq ({_JOB_COLUMNS})
+SELECT id, command, ?, ?, max_retries, created_at, ?
+FROM jobs WHERE id = ?
+"""
+_SQL_MOVE_FROM_DLQ = f"""
+INSERT INTO jobs ({_JOB_COLUMNS})
+SELECT id, command, ?, ?, max_retries, created_at, ?
+FROM dlq WHERE id = ?
+"""
+_SQL_UPDATE_JOB = """
+UPDATE jobs
+SET state = ?, attempts = ?, updated_at = ?, run_at = ?
+WHERE id = ?
+"""
+_SQL_DELETE_JOB = "DELETE FROM jobs WHERE id = ?"
+_SQL_DELETE_DLQ = "DELETE FROM dlq WHERE id = ?"
+_SQL_CLAIM_SELECT = f"""
+SELECT {_JOB_COLUMNS}
+FROM jobs
+WHERE state = ? AND run_at <= ?
+ORDER BY created_at
+LIMIT ?
+"""
+_SQL_CLAIM_UPDATE = """
+UPDATE jobs
+SET state = ?, updated_at = ?
+WHERE id IN ({placeholders})
+"""
+_SQL_JOB_STATS = """
+SELECT
+    COALESCE(SUM(state = ?), 0),
+    COALESCE(SUM(state = ?), 0),
+    COALESCE(SUM(state = ?), 0),
+    COALESCE(SUM(state = ?), 0),
+    (SELECT COUNT(*) FROM dlq)
+FROM jobs
+"""
+_SQL_LIST_JOBS = f"""
+SELECT {_JOB_COLUMNS}
+FROM jobs
+WHERE state = ?
+ORDER BY created_at
+"""
+_SQL_LIST_DLQ = f"""
+SELECT {_JOB_COLUMNS}
+FROM dlq
+WHERE state = ?
+ORDER BY created_at
+"""
+_SQL_FIND_DLQ = f"""
+SELECT {_JOB_COLUMNS}
+FROM dlq WHERE id = ?
+"""
+
+def _apply_pragmas(conn: sqlite3.Connection):
+    """Tunes a freshly opened connection."""
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+
 @contextmanager
 def get_db_conn():
     """
@@ -18,25 +111,48 @@ def get_db_conn():
     """
     # Check if a connection already exists for this thread
     if not hasattr(local_storage, "connection"):
-        # Set timeout to handle potential lock contention
-        local_storage.connection = sqlite3.connect(DB_PATH, timeout=10)
-        # This is key for getting dict-like rows
-        local_storage.connection.row_factory = sqlite3.Row 
+        new_conn = sqlite3.connect(DB_PATH, cached_statements=256)
+        try:
+            # This is key for getting dict-like rows
+            new_conn.row_factory = sqlite3.Row
+            _apply_pragmas(new_conn)
+            # One cursor per thread, reused by every query below
+            new_cursor = new_conn.cursor()
+        except BaseException:
+            # Don't leave a half-configured connection behind for this thread
+            new_conn.close()
+            raise
+        local_storage.connection = new_conn
+        local_storage.cursor = new_cursor
+        local_storage.depth = 0
 
     conn = local_storage.connection
+    # Nested blocks share the outermost transaction, so several
+    # writes can be grouped into a single commit.
+    local_storage.depth += 1
     try:
         yield conn
-        conn.commit()
+        if local_storage.depth == 1:
+            conn.commit()
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        if local_storage.depth > 1:
+            # Let the outermost block decide what to do
+            raise
+        log.error("Database error: %s", e)
         conn.rollback()
+    finally:
+        local_storage.depth -= 1
     # We don't close the connection here; it's managed per-thread.
     # A more robust solution might use a connection pool.
 
+def _cursor() -> sqlite3.Cursor:
+    """Returns this thread's shared cursor. Only valid inside get_db_conn()."""
+    return local_storage.cursor
+
 def init_db():
     """Initializes the database schema."""
-    with get_db_conn() as conn:
-        cursor = conn.cursor()
+    with get_db_conn():
+        cursor = _cursor()
         # Main job queue table
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS jobs (
@@ -46,9 +162,14 @@ def init_db():
             attempts INTEGER NOT NULL DEFAULT 0,
             max_retries INTEGER NOT NULL,
             created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
+            updated_at TEXT NOT NULL,
+            run_at INTEGER NOT NULL DEFAULT 0
         );
         """)
+        # Older databases predate run_at (unix seconds before which a job is not claimed)
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(jobs)").fetchall()]
+        if "run_at" not in columns:
+            cursor.execute("ALTER TABLE jobs ADD COLUMN run_at INTEGER NOT NULL DEFAULT 0;")
         # Dead Letter Queue (DLQ) table
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS dlq (
@@ -61,165 +182,224 @@ def init_db():
             updated_at TEXT NOT NULL
         );
         """)
-        # Index for efficient pending job queries
+        # Narrow index on state: job_stats scans it, and it is far smaller
+        # to read than the covering index below.
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state_created_at ON jobs (state, created_at);")
+        # Covering index for pending job queries and listings: every selected
+        # column (and the run_at filter) is in the index, so these become
+        # index-only scans.
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_cover_run_at
+        ON jobs (state, created_at, id, command, attempts, max_retries, updated_at, run_at);
+        """)
+        cursor.execute("DROP INDEX IF EXISTS idx_jobs_cover;")
+        # find_dlq_job looks up by id, which the dlq PRIMARY KEY already indexes.
 
-def add_job(job: Job) -> bool:
-    """Adds a new job to the database."""
-    job.max_retries = get_config_value("max_retries")
-    try:
-        with get_db_conn() as conn:
-            conn.execute("""
-            INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (job.id, job.command, job.state.value, job.attempts, job.max_retries, job.created_at, job.updated_at))
-        return True
-    except sqlite3.IntegrityError:
-        print(f"Error: Job with ID {job.id} already exists.")
-        return False
+def _job_params(job: Job) -> Tuple:
+    """Returns a job's values in _JOB_COLUMNS order."""
+    return (job.id, job.command, job.state.value, job.attempts, job.max_retries, job.created_at, job.updated_at)
+
+def add_job(job: Job, max_retries: Optional[int] = None) -> bool:
+    """
+    Adds a new job to the database.
+    max_retries falls back to the configured value when not given.
+    """
+    job.max_retries = max_retries if max_retries is not None else get_config_value("max_retries")
+    inserted = False
+    with get_db_conn():
+        cursor = _cursor()
+        cursor.execute(_SQL_INSERT_JOB, _job_params(job))
+        inserted = cursor.rowcount == 1
+    if not inserted:
+        log.warning("Error: Job with ID %s already exists.", job.id)
+    return inserted
+
+def add_jobs(jobs: List[Job]) -> Optional[int]:
+    """
+    Adds many jobs in a single transaction.
+    Jobs are inserted as given (max_retries is not filled in from config).
+    Jobs whose ID already exists are skipped; returns the number inserted,
+    or None if a database error rolled back the whole batch.
+    """
+    inserted = None
+    with get_db_conn():
+        cursor = _cursor()
+        cursor.executemany(_SQL_INSERT_JOB, [_job_params(job) for job in jobs])
+        inserted = cursor.rowcount
+    return inserted
 
 def update_job(job: Job):
     """Updates an existing job's state and metadata."""
-    job.updated_at = datetime.utcnow().isoformat()
-    with get_db_conn() as conn:
-        conn.execute("""
-        UPDATE jobs
-        SET state = ?, attempts = ?, updated_at = ?
-        WHERE id = ?
-        """, (job.state.value, job.attempts, job.updated_at, job.id))
+    job.updated_at = utcnow_iso()
+    with get_db_conn():
+        _cursor().execute(_SQL_UPDATE_JOB, (job.state.value, job.attempts, job.updated_at, job.run_at, job.id))
+
+def update_jobs(jobs: List[Job]):
+    """Updates several jobs' state and metadata in a single transaction."""
+    now = utcnow_iso()
+    for job in jobs:
+        job.updated_at = now
+    with get_db_conn():
+        _cursor().executemany(_SQL_UPDATE_JOB, [(job.state.value, job.attempts, job.updated_at, job.run_at, job.id) for job in jobs])
 
 def move_to_dlq(job: Job):
     """Atomically moves a job from the main queue to the DLQ."""
     job.state = JobState.DEAD
-    job.updated_at = datetime.utcnow().isoformat()
-    with get_db_conn() as conn:
-        # Insert into DLQ
-        conn.execute("""
-        INSERT INTO dlq (id, command, state, attempts, max_retries, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (job.id, job.command, job.state.value, job.attempts, job.max_retries, job.created_at, job.updated_at))
+    job.updated_at = utcnow_iso()
+    with get_db_conn():
+        cursor = _cursor()
+        # Copy into DLQ (attempts are bound as the worker hasn't persisted them yet)
+        cursor.execute(_SQL_MOVE_TO_DLQ, (DEAD, job.attempts, job.updated_at, job.id))
         
         # Delete from main jobs table
-        conn.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+        cursor.execute(_SQL_DELETE_JOB, (job.id,))
 
-def get_next_pending_job_atomic() -> Optional[Job]:
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    """Returns True if the error is lock contention rather than a real failure."""
+    code = getattr(e, "sqlite_errorcode", None)
+    if code is not None:
+        # Extended codes (e.g. SQLITE_BUSY_SNAPSHOT) keep the primary code in the low byte
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    # Python < 3.11 doesn't expose the code; fall back to the message
+    message = str(e)
+    return "locked" in message or "busy" in message
+
+def _begin_immediate(cursor: sqlite3.Cursor) -> bool:
     """
-    Atomically fetches and locks the next pending job.
+    Starts a write transaction, retrying with jittered backoff if the
+    database stays busy past busy_timeout. Returns False if it never got the lock.
+    Any other error (disk I/O, read-only file, ...) is logged and not retried.
+    """
+    for attempt in range(BEGIN_RETRIES):
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            return True
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                log.error("Could not start a transaction: %s", e)
+                return False
+            if attempt < BEGIN_RETRIES - 1:
+                time.sleep(random.uniform(0, 0.1 * 2 ** attempt))
+    log.warning("Database still busy after %d attempts; skipping this claim.", BEGIN_RETRIES)
+    return False
+
+def claim_batch(limit: int) -> List[Job]:
+    """
+    Atomically fetches and locks up to `limit` pending jobs.
     This is the most critical part for concurrency.
     """
     with get_db_conn() as conn:
-        cursor = conn.cursor()
+        cursor = _cursor()
         
         # SQLite's BEGIN IMMEDIATE acquires a write lock, preventing other
         # workers from picking up jobs until we're done.
         # This is a simple and effective locking mechanism.
+        if not _begin_immediate(cursor):
+            return []
+        
         try:
-            # Start an immediate transaction to lock
-            cursor.execute("BEGIN IMMEDIATE")
-            
-            # Find the oldest pending job
-            cursor.execute("""
-            SELECT id, command, state, attempts, max_retries, created_at, updated_at
-            FROM jobs
-            WHERE state = ?
-            ORDER BY created_at
-            LIMIT 1
-            """, (JobState.PENDING.value,))
+            # Find the oldest pending jobs that are due
+            cursor.execute(_SQL_CLAIM_SELECT, (PENDING, int(time.time()), limit))
             
-            row = cursor.fetchone()
+            rows = cursor.fetchall()
             
-            if row is None:
+            if not rows:
                 cursor.execute("COMMIT")
-                return None
+                return []
             
-            job = Job.from_db_row(row)
+            jobs = [Job.from_row(row) for row in rows]
             
-            # Lock this job by updating its state
-            job.state = JobState.PROCESSING
-            job.updated_at = datetime.utcnow().isoformat()
+            # Lock the whole batch with a single UPDATE
+            now = utcnow_iso()
+            for job in jobs:
+                job.state = JobState.PROCESSING
+                job.updated_at = now
             
-            cursor.execute("""
-            UPDATE jobs
-            SET state = ?, updated_at = ?
-            WHERE id = ?
-            """, (job.state.value, job.updated_at, job.id))
+            placeholders = ", ".join("?" * len(jobs))
+            cursor.execute(_SQL_CLAIM_UPDATE.format(placeholders=placeholders),
+                           (PROCESSING, now, *[job.id for job in jobs]))
             
             cursor.execute("COMMIT")
-            return job
+            return jobs
             
         except sqlite3.Error as e:
-            # Check for "database is locked" error
-            if "locked" in str(e):
-                print(f"[Worker {os.getpid()}] Database locked, another worker is picking job. Skipping.")
-                cursor.execute("ROLLBACK")
-                return None
-            print(f"Locking error: {e}")
-            cursor.execute("ROLLBACK")
-            return None
+            log.error("Locking error: %s", e)
+            conn.rollback()
+            return []
+
+def get_next_pending_job_atomic() -> Optional[Job]:
+    """Atomically fetches and locks the next pending job."""
+    jobs = claim_batch(1)
+    return jobs[0] if jobs else None
 
 def get_job_stats() -> Dict[str, int]:
     """Returns a count of jobs by state."""
-    stats = {state.value: 0 for state in JobState}
-    with get_db_conn() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT state, COUNT(*) as count FROM jobs GROUP BY state")
-        for row in cursor.fetchall():
-            if row['state'] in stats:
-                stats[row['state']] = row['count']
-        
-        # Get DLQ count
-        cursor.execute("SELECT COUNT(*) as count FROM dlq")
-        dlq_count = cursor.fetchone()['count']
-        stats[JobState.DEAD.value] = dlq_count
-    return stats
+    with get_db_conn():
+        # One round-trip: every count, including the DLQ, comes back in a single row
+        row = _cursor().execute(_SQL_JOB_STATS, (PENDING, PROCESSING, COMPLETED, FAILED)).fetchone()
+    pending, processing, completed, failed, dead = row
+    return {
+        PENDING: pending,
+        PROCESSING: processing,
+        COMPLETED: completed,
+        FAILED: failed,
+        DEAD: dead,
+    }
 
 def list_jobs_by_state(state: JobState) -> List[Job]:
     """Lists all jobs in a given state."""
-    table = "dlq" if state == JobState.DEAD else "jobs"
-    with get_db_conn() as conn:
-        cursor = conn.cursor()
-        cursor.execute(f"""
-        SELECT id, command, state, attempts, max_retries, created_at, updated_at
-        FROM {table}
-        WHERE state = ?
-        ORDER BY created_at
-        """, (state.value,))
+    sql = _SQL_LIST_DLQ if state == JobState.DEAD else _SQL_LIST_JOBS
+    with get_db_conn():
+        cursor = _cursor()
+        cursor.execute(sql, (state.value,))
         
-        return [Job.from_db_row(row) for row in cursor.fetchall()]
+        return [Job.from_row(row) for row in cursor.fetchall()]
+
+def list_jobs_as_dicts(state: JobState) -> List[Dict[str, Any]]:
+    """
+    Lists all jobs in a given state as plain dicts.
+    This skips building Job objects for callers that only serialize them.
+    """
+    sql = _SQL_LIST_DLQ if state == JobState.DEAD else _SQL_LIST_JOBS
+    with get_db_conn():
+        cursor = _cursor()
+        cursor.execute(sql, (state.value,))
+        
+        return [dict(row) for row in cursor.fetchall()]
 
 def find_dlq_job(job_id: str) -> Optional[Job]:
     """Finds a specific job in the DLQ."""
-    with get_db_conn() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT id, command, state, attempts, max_retries, created_at, updated_at
-        FROM dlq WHERE id = ?
-        """, (job_id,))
+    with get_db_conn():
+        cursor = _cursor()
+        cursor.execute(_SQL_FIND_DLQ, (job_id,))
         row = cursor.fetchone()
-        return Job.from_db_row(row) if row else None
+        return Job.from_row(row) if row else None
 
 def retry_dlq_job(job: Job) -> bool:
     """Moves a job from the DLQ back to the main queue as pending."""
     job.state = JobState.PENDING
     job.attempts = 0 # Reset attempts
-    job.updated_at = datetime.utcnow().isoformat()
+    job.updated_at = utcnow_iso()
     
-    with get_db_conn() as conn:
+    with get_db_conn():
+        cursor = _cursor()
         try:
-            # Insert back into main jobs table
-            conn.execute("""
-            INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (job.id, job.command, job.state.value, job.attempts, job.max_retries, job.created_at, job.updated_at))
+            # Copy back into main jobs table
+            cursor.execute(_SQL_MOVE_FROM_DLQ, (PENDING, job.attempts, job.updated_at, job.id))
+            if cursor.rowcount == 0:
+                # Job is no longer in the DLQ
+                return False
             
             # Delete from DLQ
-            conn.execute("DELETE FROM dlq WHERE id = ?", (job.id,))
+            cursor.execute(_SQL_DELETE_DLQ, (job.id,))
             return True
         except sqlite3.Error as e:
-            print(f"Error retrying job: {e}")
+            log.error("Error retrying job: %s", e)
             return False
+
 def close_db_conn():
     """Closes the connection for the current thread."""
     if hasattr(local_storage, "connection"):
         local_storage.connection.close()
-        del local_storage.connection
\ No newline at end of file
+        del local_storage.connection
+        del local_storage.cursor
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""
+Shared logger for queuectl.
+The level comes from the QUEUECTL_LOG_LEVEL environment variable (default INFO).
+"""
+import logging
+import os
+
+LOG_LEVEL_ENV = "QUEUECTL_LOG_LEVEL"
+
+log = logging.getLogger("queuectl")
+
+if not log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_handler)
+    log.propagate = False
+    try:
+        log.setLevel(os.environ.get(LOG_LEVEL_ENV, "INFO").upper())
+    except ValueError:
+        log.setLevel(logging.INFO)
@@ -1,23 +1,42 @@
+import importlib
+
 import typer
+from typer.core import TyperGroup
 from .database import init_db
 
+# Sub-command name -> module in queuectl.cli exposing a Typer `app`.
+# Modules are only imported when their command is actually invoked.
+SUBCOMMANDS = {
+    "enqueue": "enqueue",
+    "worker": "worker_cli",
+    "status": "status",
+    "list": "list_jobs",
+    "dlq": "dlq",
+    "config": "config_cli",
+}
+
+class LazyGroup(TyperGroup):
+    """A command group that imports sub-command modules on first use."""
+
+    def list_commands(self, ctx):
+        return list(super().list_commands(ctx)) + list(SUBCOMMANDS)
+
+    def get_command(self, ctx, name):
+        if name not in SUBCOMMANDS:
+            return super().get_command(ctx, name)
+        module = importlib.import_module(f".cli.{SUBCOMMANDS[name]}", __package__)
+        command = typer.main.get_group(module.app)
+        command.name = name
+        return command
+
 # Create the main Typer app
 app = typer.Typer(
     name="queuectl",
     help="A CLI-based background job queue system.",
-    no_args_is_help=True
+    no_args_is_help=True,
+    cls=LazyGroup,
 )
 
-# Import and add sub-commands
-from .cli import enqueue, worker_cli, status, list_jobs, dlq, config_cli
-
-app.add_typer(enqueue.app, name="enqueue")
-app.add_typer(worker_cli.app, name="worker")
-app.add_typer(status.app, name="status")
-app.add_typer(list_jobs.app, name="list")
-app.add_typer(dlq.app, name="dlq")
-app.add_typer(config_cli.app, name="config")
-
 
 @app.callback()
 def main_callback():
@@ -28,4 +47,4 @@ def main_callback():
     init_db()
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -1,9 +1,30 @@
+import sys
+import time
 import uuid
 import sqlite3
 from enum import Enum
 from typing import Optional
 from dataclasses import dataclass, field
-from datetime import datetime
+
+# [second the prefix was formatted for, "YYYY-MM-DDTHH:MM:SS" prefix, last microsecond returned]
+_ts_cache = [-1, "", 0]
+
+def utcnow_iso() -> str:
+    """
+    Returns the current UTC time as an ISO-8601 string with microsecond precision.
+    Only the seconds prefix is formatted with strftime, once per second.
+    Values are strictly increasing within a process, so jobs created in a
+    tight loop (e.g. bulk enqueue) keep their FIFO order under ORDER BY created_at.
+    """
+    now_us = time.time_ns() // 1000
+    if now_us <= _ts_cache[2]:
+        now_us = _ts_cache[2] + 1
+    _ts_cache[2] = now_us
+    sec, usec = divmod(now_us, 1_000_000)
+    if _ts_cache[0] != sec:
+        _ts_cache[0] = sec
+        _ts_cache[1] = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+    return f"{_ts_cache[1]}.{usec:06d}"
 
 class JobState(str, Enum):
     """Enumeration of possible job states."""
@@ -13,7 +34,17 @@ class JobState(str, Enum):
     FAILED = "failed"
     DEAD = "dead"
 
-@dataclass
+# Plain-string state values, for hot paths that bind states as SQL parameters
+PENDING = JobState.PENDING.value
+PROCESSING = JobState.PROCESSING.value
+COMPLETED = JobState.COMPLETED.value
+FAILED = JobState.FAILED.value
+DEAD = JobState.DEAD.value
+
+# slots=True is only available on Python 3.10+
+_DATACLASS_OPTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_OPTS)
 class Job:
     """
     Represents a single job in the queue.
@@ -24,8 +55,9 @@ class Job:
     state: JobState = JobState.PENDING
     attempts: int = 0
     max_retries: int = field(default_factory=lambda: 3) # Can be overridden by config
-    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
-    updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    created_at: str = field(default_factory=utcnow_iso)
+    updated_at: str = field(default_factory=utcnow_iso)
+    run_at: int = 0 # Unix time before which the job won't be claimed
     
     # Helper methods for JSON/DB serialization
     def to_dict(self) -> dict:
@@ -52,26 +84,18 @@ class Job:
         )
     
     @staticmethod
-    def from_db_row(row: tuple) -> 'Job': # <-- THIS IS THE CORRECTED LINE
-        """Creates a Job object from a database row tuple."""
-        # Check if row is a dict (from row_factory) or tuple
-        if isinstance(row, sqlite3.Row) or isinstance(row, dict):
-            return Job(
-                id=row["id"],
-                command=row["command"],
-                state=JobState(row["state"]),
-                attempts=row["attempts"],
-                max_retries=row["max_retries"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
-        else: # Fallback for standard tuple
-            return Job(
-                id=row[0],
-                command=row[1],
-                state=JobState(row[2]),
-                attempts=row[3],
-                max_retries=row[4],
-                created_at=row[5],
-                updated_at=row[6],
-            )
\ No newline at end of file
+    def from_row(row: sqlite3.Row) -> 'Job':
+        """
+        Creates a Job object from a database row.
+        Rows must be selected in the column order
+        (id, command, state, attempts, max_retries, created_at, updated_at).
+        """
+        return Job(
+            id=row[0],
+            command=row[1],
+            state=JobState(row[2]),
+            attempts=row[3],
+            max_retries=row[4],
+            created_at=row[5],
+            updated_at=row[6],
+        )
@@ -2,31 +2,58 @@ import subprocess
 import time
 import signal
 import os
+import struct
 import sys
-from datetime import datetime
-import psutil
-from typing import List, Dict
+from collections import deque
+from typing import Any, List, Dict
 
 from .models import Job, JobState
-# We must import init_db separately for the fix
-from .database import get_next_pending_job_atomic, update_job, move_to_dlq, init_db
-from .config import get_config_value, PID_FILE
+from .database import claim_batch, update_job, update_jobs, move_to_dlq
+from .config import load_config, DEFAULT_CONFIG, MIN_CONFIG_VALUES, PID_FILE
+from .log import log
+
+# PID of this process, used in every log line. Workers are spawned fresh
+# (not forked), so this is computed once per worker.
+_PID = os.getpid()
+
+# How long get_worker_status samples CPU usage, across all workers at once
+CPU_SAMPLE_INTERVAL = 0.05
 
 # Flag to control graceful shutdown
 shutdown_flag = False
+# Flag to re-read the config on the next loop iteration
+reload_flag = False
 
 def signal_handler(signum, frame):
     """Handles termination signals for graceful shutdown."""
     global shutdown_flag
-    print(f"Signal {signum} received, shutting down gracefully...")
+    log.info("Signal %d received, shutting down gracefully...", signum)
     shutdown_flag = True
 
+def reload_handler(signum, frame):
+    """Handles SIGHUP by scheduling a config reload."""
+    global reload_flag
+    reload_flag = True
+
+def load_worker_config() -> Dict[str, Any]:
+    """
+    Snapshots the config for the worker loop, filling in any missing keys
+    and replacing out-of-range values (e.g. from a hand-edited file) with defaults.
+    """
+    cfg = {**DEFAULT_CONFIG, **load_config()}
+    for key, minimum in MIN_CONFIG_VALUES.items():
+        value = cfg[key]
+        if type(value) is not int or value < minimum:
+            log.warning("[Worker %d] Invalid %s %r in config, using %r.", _PID, key, value, DEFAULT_CONFIG[key])
+            cfg[key] = DEFAULT_CONFIG[key]
+    return cfg
+
 def execute_job(job: Job) -> bool:
     """
     Executes a job's command using subprocess.
     Returns True on success (exit code 0), False otherwise.
     """
-    print(f"[Worker {os.getpid()}] Processing job {job.id}: {job.command}")
+    log.debug("[Worker %d] Processing job %s: %s", _PID, job.id, job.command)
     try:
         # Using shlex.split might be safer, but for this spec,
         # shell=True executes the raw command string.
@@ -40,39 +67,52 @@ def execute_job(job: Job) -> bool:
             text=True,
             timeout=300 # 5-minute timeout
         )
-        print(f"[Worker {os.getpid()}] Job {job.id} completed. Output:\n{result.stdout}")
+        log.debug("[Worker %d] Job %s completed. Output:\n%s", _PID, job.id, result.stdout)
         return True
     except subprocess.CalledProcessError as e:
-        print(f"[Worker {os.getpid()}] Job {job.id} failed. Error:\n{e.stderr}")
+        log.warning("[Worker %d] Job %s failed. Error:\n%s", _PID, job.id, e.stderr)
         return False
     except subprocess.TimeoutExpired:
-        print(f"[Worker {os.getpid()}] Job {job.id} timed out.")
+        log.warning("[Worker %d] Job %s timed out.", _PID, job.id)
         return False
     except Exception as e:
-        print(f"[Worker {os.getpid()}] Job {job.id} failed with unexpected error: {e}")
+        log.warning("[Worker %d] Job %s failed with unexpected error: %s", _PID, job.id, e)
         return False
 
 def run_worker():
-    """The main loop for a single worker process."""
-    
-    # --- THIS IS THE FIX ---
-    # Initialize the DB *within* the new child process.
-    # This creates a fresh, safe connection.
-    init_db()
-    # --- END OF FIX ---
+    """
+    The main loop for a single worker process.
+    Expects init_db() to have been called (see worker_entry).
+    """
     
     # Register signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    # SIGHUP re-reads the config; otherwise it is read once at startup
+    signal.signal(signal.SIGHUP, reload_handler)
+    
+    log.info("[Worker %d] Started and waiting for jobs...", _PID)
     
-    print(f"[Worker {os.getpid()}] Started and waiting for jobs...")
+    global reload_flag
+    cfg = load_worker_config()
+    
+    # Jobs claimed from the DB but not yet executed by this worker
+    claimed = deque()
     
     while not shutdown_flag:
         job = None
         try:
-            job = get_next_pending_job_atomic()
+            if reload_flag:
+                reload_flag = False
+                cfg = load_worker_config()
+                log.info("[Worker %d] Config reloaded.", _PID)
             
-            if job:
+            # Only go back to the DB once the local batch is drained
+            if not claimed:
+                claimed.extend(claim_batch(cfg["claim_batch_size"]))
+            
+            if claimed:
+                job = claimed.popleft()
                 job.attempts += 1
                 success = execute_job(job)
                 
@@ -80,88 +120,95 @@ def run_worker():
                     job.state = JobState.COMPLETED
                     update_job(job)
                 else:
-                    handle_failed_job(job)
+                    handle_failed_job(job, cfg)
                 
             else:
                 # No jobs, sleep for a bit to avoid busy-waiting
                 time.sleep(1)
                 
         except Exception as e:
-            print(f"[Worker {os.getpid()}] Error in worker loop: {e}")
+            log.error("[Worker %d] Error in worker loop: %s", _PID, e)
             if job:
                 # Ensure a job isn't stuck in processing if worker crashes
-                handle_failed_job(job) # Or reset to pending
+                handle_failed_job(job, cfg) # Or reset to pending
             time.sleep(1)
+    
+    # Hand any claimed-but-unstarted jobs back to the queue
+    if claimed:
+        for job in claimed:
+            job.state = JobState.PENDING
+        update_jobs(list(claimed))
+        log.info("[Worker %d] Released %d unstarted job(s).", _PID, len(claimed))
             
-    print(f"[Worker {os.getpid()}] Shutdown complete.")
+    log.info("[Worker %d] Shutdown complete.", _PID)
 
-def handle_failed_job(job: Job):
+def handle_failed_job(job: Job, cfg: Dict[str, Any]):
     """Handles retry logic and DLQ promotion for a failed job."""
-    config_max_retries = get_config_value("max_retries")
-    backoff_base = get_config_value("backoff_base")
+    config_max_retries = cfg["max_retries"]
+    backoff_base = cfg["backoff_base"]
 
     # Ensure job's max_retries is in sync with config, or use its own
     max_retries = job.max_retries if job.max_retries > 0 else config_max_retries
     
     if job.attempts >= max_retries:
-        print(f"[Worker {os.getpid()}] Job {job.id} failed. Max retries ({max_retries}) reached. Moving to DLQ.")
+        log.warning("[Worker %d] Job %s failed. Max retries (%d) reached. Moving to DLQ.", _PID, job.id, max_retries)
         move_to_dlq(job)
     else:
-        # It failed, but can be retried
-        job.state = JobState.FAILED
-        update_job(job) # Record the failure and attempt count
-        
         # Calculate exponential backoff
-        # We don't actually sleep here. We set it back to PENDING
-        # but it will be picked up later.
-        # A true backoff would involve a 'run_at' time.
-        # For this spec, we'll just log the "delay" and re-queue.
+        # Instead of sleeping the worker, the job is given a 'run_at'
+        # time and won't be claimed again until it has passed.
         delay = backoff_base ** job.attempts
-        print(f"[Worker {os.getpid()}] Job {job.id} failed. Retrying (attempt {job.attempts}/{max_retries}). Next attempt after ~{delay}s.")
+        log.info("[Worker %d] Job %s failed. Retrying (attempt %d/%d). Next attempt after ~%ss.", _PID, job.id, job.attempts, max_retries, delay)
         
-        # To simulate backoff, we'll just put it back to PENDING.
-        # In a real system, we'd use a 'run_at' field.
-        # For simplicity, we just put it back at the end of the line.
+        # Put it straight back to PENDING, due once the backoff has elapsed.
+        # This one write records the attempt count and the backoff together.
         job.state = JobState.PENDING
-        update_job(job) # This updates 'updated_at', so it goes to the "end"
-        
-        # A simple sleep to prevent a fast-failing job from
-        # hammering the CPU. This is a *worker-side* delay.
-        time.sleep(delay)
+        job.run_at = int(time.time()) + delay
+        update_job(job)
+
+def _write_pids(pids: List[int]):
+    """Writes PIDs to the PID file as fixed-width native ints."""
+    with open(PID_FILE, 'wb') as f:
+        f.write(struct.pack(f"={len(pids)}i", *pids))
+
+def _read_pids() -> List[int]:
+    """Reads the PIDs written by _write_pids, or by older versions as text."""
+    with open(PID_FILE, 'rb') as f:
+        data = f.read()
+    # Older versions wrote one decimal PID per line. A binary file can't look
+    # like that: PIDs stay below 2**22, so every packed int has a zero byte.
+    if data.endswith(b"\n") and not data.translate(None, b"0123456789\r\n"):
+        return [int(line) for line in data.split()]
+    count = len(data) // 4
+    return list(struct.unpack(f"={count}i", data[:count * 4]))
 
 def start_workers(count: int):
     """Starts a specified number of worker processes."""
     pids = []
     print(f"Starting {count} worker(s)...")
     for _ in range(count):
-        pid = os.fork()
-        if pid == 0:
-            # This is the child process
-            try:
-                run_worker()
-            except KeyboardInterrupt:
-                pass # Child process exits
-            sys.exit(0)
-        else:
-            # This is the parent process
-            pids.append(pid)
+        # Each worker is a fresh interpreter, so it doesn't inherit the
+        # CLI's heap or its open DB connection the way os.fork() did.
+        proc = subprocess.Popen([sys.executable, "-m", "queuectl.worker_entry"])
+        pids.append(proc.pid)
     
     # Store PIDs
-    with open(PID_FILE, 'w') as f:
-        f.writelines([f"{pid}\n" for pid in pids])
+    _write_pids(pids)
     
     print(f"Workers started with PIDs: {pids}")
 
 def stop_workers():
     """Stops all running worker processes gracefully."""
+    # Imported here so workers and most CLI commands never load psutil
+    import psutil
+
     if not PID_FILE.exists():
         print("No workers seem to be running (PID file not found).")
         return
 
     pids_to_remove = []
     if os.path.getsize(PID_FILE) > 0:
-        with open(PID_FILE, 'r') as f:
-            pids = [int(line.strip()) for line in f if line.strip()]
+        pids = _read_pids()
 
         if not pids:
             print("No workers PIDs found.")
@@ -190,6 +237,8 @@ def stop_workers():
 
 def get_worker_status() -> List[Dict]:
     """Checks the status of running workers."""
+    import psutil
+
     status = []
     if not PID_FILE.exists():
         return status
@@ -197,30 +246,51 @@ def get_worker_status() -> List[Dict]:
     if os.path.getsize(PID_FILE) == 0:
         return status
         
-    with open(PID_FILE, 'r') as f:
-        pids = [int(line.strip()) for line in f if line.strip()]
+    pids = _read_pids()
+
+    # First pass: prime every process's CPU counter, so a single short
+    # sleep measures all of them instead of sleeping once per worker.
+    procs = {}
+    errors = {}
+    for pid in pids:
+        try:
+            proc = psutil.Process(pid)
+            proc.cpu_percent(interval=None)
+            procs[pid] = proc
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.Error as e:
+            # e.g. AccessDenied for a reused PID owned by another user
+            errors[pid] = e
+    if procs:
+        time.sleep(CPU_SAMPLE_INTERVAL)
 
+    # Second pass: collect the readings
     active_pids = []
     for pid in pids:
+        if pid in errors:
+            status.append({"pid": pid, "status": f"error: {errors[pid]}"})
+            continue
+        proc = procs.get(pid)
+        if proc is None:
+            status.append({"pid": pid, "status": "not_found (stale PID)"})
+            continue
         try:
-            if psutil.pid_exists(pid):
-                proc = psutil.Process(pid)
+            # oneshot() batches the underlying /proc reads
+            with proc.oneshot():
                 status.append({
                     "pid": pid,
                     "status": proc.status(),
-                    "cpu_percent": proc.cpu_percent(interval=0.01),
+                    "cpu_percent": proc.cpu_percent(interval=None),
                     "memory_mb": proc.memory_info().rss / (1024 * 1024),
                 })
-                active_pids.append(pid) # Keep tracking this active pid
-            else:
-                status.append({"pid": pid, "status": "not_found (stale PID)"})
+            active_pids.append(pid) # Keep tracking this active pid
         except psutil.NoSuchProcess:
             status.append({"pid": pid, "status": "stopped"})
         except Exception as e:
             status.append({"pid": pid, "status": f"error: {e}"})
 
     # Re-write the PID file with only active pids
-    with open(PID_FILE, 'w') as f:
-        f.writelines([f"{pid}\n" for pid in active_pids])
+    _write_pids(active_pids)
 
-    return status
\ No newline at end of file
+    return status
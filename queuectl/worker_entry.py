@@ -0,0 +1,20 @@
+"""
+Entry point for a single worker process.
+Started by `queuectl worker start` as `python -m queuectl.worker_entry`,
+so each worker is a fresh interpreter rather than a fork of the CLI.
+"""
+import sys
+
+from .database import init_db
+from .worker import run_worker
+
+def main():
+    init_db()
+    try:
+        run_worker()
+    except KeyboardInterrupt:
+        pass # Worker process exits
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ setup(
     install_requires=[
         'typer[all]',
         'psutil',
+        'orjson',
     ],
     entry_points={
         'console_scripts': [